@@ -2,7 +2,9 @@ import pygame
 import platform
 import asyncio
 import math
-from functools import lru_cache
+import time
+from collections import OrderedDict
+import numpy as np
 
 # -------------------
 # Constants
@@ -19,6 +21,10 @@ TERRAIN_COLORS = {
 TILE_SIZE = 32
 SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 720
 
+# Frame rate while the user is interacting, and while the view is idle
+ACTIVE_FPS = 60
+IDLE_FPS = 15
+
 MIN_ZOOM = 0.1
 MAX_ZOOM = 4.0
 
@@ -38,6 +44,8 @@ SEED = 1337
 ELEV_OCTAVES = 6
 MOIST_OCTAVES = 4
 RIVER_OCTAVES = 5
+# Low-resolution elevation octaves used to find nearby sea
+COAST_OCTAVES = 2
 ELEV_FREQ = 1 / 50.0
 MOIST_FREQ = 1 / 20.0
 RIVER_FREQ = 1 / 100.0
@@ -46,29 +54,60 @@ BEACH_WIDTH = 0.03
 MOUNTAIN_LEVEL = 0.75
 RIVER_THRESHOLD = 0.18
 
+# Offset, in tiles, of the neighbours sampled for the coastal moisture boost
+NEAR_SEA_STEP = 3
+
+# Terrain is generated and cached in square chunks of CHUNK_SIZE tiles
+CHUNK_SHIFT = 6
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+# Marks unpainted tiles in a chunk's override layer
+NO_OVERRIDE = 255
+# Generated chunks kept in memory: four screens' worth at minimum zoom
+CHUNK_CACHE_CAPACITY = 4 * (
+    math.ceil(SCREEN_WIDTH / (TILE_SIZE * MIN_ZOOM) / CHUNK_SIZE + 2) *
+    math.ceil((SCREEN_HEIGHT - UI_HEIGHT) / (TILE_SIZE * MIN_ZOOM) / CHUNK_SIZE + 2)
+)
+# Scaled chunk pieces cover the view rounded out to steps of about this many
+# pixels, so small scrolls at a fixed zoom reuse them
+SCALE_STEP_PX = 128
+
 # -------------------
 # Noise functions
 # -------------------
+HASH_SCALE = 1.0 / (1 << 24)
+
+# All noise functions operate elementwise on NumPy arrays of tile coordinates,
+# so a whole grid of tiles is generated with a handful of vectorized passes.
 def hash01(ix, iy, seed=SEED):
-    n = (ix * 374761393 + iy * 668265263 + seed * 982451653) & 0xFFFFFFFF
-    n = (n ^ (n >> 13)) * 1274126177 & 0xFFFFFFFF
-    return (n & 0xFFFFFF) / float(1 << 24)
+    # Two-round partial Murmur mix on uint32 lanes; overflow wraps, so no
+    # masking is needed
+    n = ix.astype(np.uint32) * 0x1B873593
+    n ^= iy.astype(np.uint32) * 0xCC9E2D51
+    n ^= (seed * 0x85EBCA77) & 0xFFFFFFFF
+    n ^= n >> 15
+    n *= 0xC2B2AE3D
+    n ^= n >> 13
+    return (n & 0xFFFFFF) * HASH_SCALE
 
 def fade(t):
     return t * t * t * (t * (t * 6 - 15) + 10)
 
+# fade() sampled at FADE_LUT_SIZE steps over [0, 1]; the extra entry covers t == 1
+FADE_LUT_SIZE = 1024
+FADE_LUT = fade(np.arange(FADE_LUT_SIZE + 1) / FADE_LUT_SIZE).astype(np.float32)
+
 def lerp(a, b, t):
     return a + (b - a) * t
 
 def value_noise(x, y, freq):
     fx = x * freq
     fy = y * freq
-    ix = math.floor(fx)
-    iy = math.floor(fy)
+    ix = np.floor(fx).astype(np.int32)
+    iy = np.floor(fy).astype(np.int32)
     tx = fx - ix
     ty = fy - iy
-    u = fade(tx)
-    v = fade(ty)
+    u = FADE_LUT.take((tx * FADE_LUT_SIZE).astype(np.intp))
+    v = FADE_LUT.take((ty * FADE_LUT_SIZE).astype(np.intp))
     n00 = hash01(ix, iy)
     n10 = hash01(ix + 1, iy)
     n01 = hash01(ix, iy + 1)
@@ -77,60 +116,170 @@ def value_noise(x, y, freq):
     nx1 = lerp(n01, n11, u)
     return lerp(nx0, nx1, v)
 
-def fbm(x, y, base_freq, octaves, persistence=0.5, lacunarity=2.0):
-    value = 0.0
+# Per-octave sampling frequencies and normalized weights for an fbm, shaped
+# (octaves, 1, 1) so they broadcast over a 2D grid of coordinates.
+# Remapping each octave to [-1, 1], dividing by the total amplitude and
+# remapping the sum back to [0, 1] folds into one weight per octave, and the
+# weighted sum stays inside [0, 1] without clipping.
+def fbm_octaves(base_freq, octaves, persistence=0.5, lacunarity=2.0):
+    frequencies = []
+    amplitudes = []
     amplitude = 1.0
     frequency = base_freq
     max_ampl = 0.0
     for _ in range(octaves):
-        value += (value_noise(x, y, frequency) * 2 - 1) * amplitude
+        frequencies.append(frequency)
+        amplitudes.append(amplitude)
         max_ampl += amplitude
         amplitude *= persistence
         frequency *= lacunarity
-    return max(0.0, min(1.0, (value / max_ampl + 1) / 2))
-
-def ridged_fbm(x, y, base_freq, octaves):
-    v = fbm(x, y, base_freq, octaves)
+    frequencies = np.array(frequencies).reshape(-1, 1, 1)
+    weights = (np.array(amplitudes) / max_ampl).reshape(-1, 1, 1)
+    return frequencies, weights
+
+# Build an fbm function with its octaves baked in, so each call site gets a
+# copy specialized for its fixed parameters. The octave loop is unrolled into
+# the array shape: every octave is sampled in one broadcast value_noise pass
+# and the weighted octaves are summed along axis 0.
+def make_fbm(base_freq, octaves, persistence=0.5, lacunarity=2.0):
+    frequencies, weights = fbm_octaves(base_freq, octaves, persistence, lacunarity)
+
+    def fbm(x, y):
+        return (value_noise(x, y, frequencies) * weights).sum(axis=0)
+    return fbm
+
+def ridged_fbm(x, y, fbm):
+    v = fbm(x, y)
     r = (1.0 - v)
     return r * r
 
+# Elevation and the coastal term are assembled by hand in get_biome_grid so
+# that they can share their common low octaves
+ELEV_FREQS, ELEV_WEIGHTS = fbm_octaves(ELEV_FREQ, ELEV_OCTAVES)
+_, COAST_WEIGHTS = fbm_octaves(ELEV_FREQ, COAST_OCTAVES)
+moist_fbm = make_fbm(MOIST_FREQ, MOIST_OCTAVES, persistence=0.65)
+river_fbm = make_fbm(RIVER_FREQ, RIVER_OCTAVES)
+
 # -------------------
-# Cached biome calculation
+# Biome generation
 # -------------------
-@lru_cache(maxsize=None)
-def get_tile_biome(tile_x, tile_y):
-    sx = tile_x + 0.5
-    sy = tile_y + 0.5
-
-    elev = fbm(sx, sy, ELEV_FREQ, ELEV_OCTAVES)
-    continental = value_noise(sx, sy, ELEV_FREQ * 0.2) * 0.25 + 0.75
-    elev *= continental
-    elev = max(0.0, min(1.0, elev))
-
-    moist = fbm(sx + 2000, sy - 1230, MOIST_FREQ, MOIST_OCTAVES, persistence=0.65)
-    near_sea = 0.0
-    for ox in (-1, 0, 1):
-        for oy in (-1, 0, 1):
-            near_elev = fbm(sx + ox * 3, sy + oy * 3, ELEV_FREQ, 2)
-            if near_elev < SEA_LEVEL:
-                near_sea += 1
-    near_sea /= 9.0
-    moist *= (0.7 + 0.8 * near_sea)
-    moist = max(0.0, min(1.0, moist))
-
-    drain = ridged_fbm(sx + 6000, sy - 4000, RIVER_FREQ, RIVER_OCTAVES)
+BIOME_NAMES = list(TERRAIN_COLORS.keys())
+BIOME_CODES = {name: code for code, name in enumerate(BIOME_NAMES)}
+TERRAIN_PALETTE = np.array([TERRAIN_COLORS[name] for name in BIOME_NAMES], dtype=np.uint8)
 
+def classify_biome(elev, moist, drain):
     if elev < SEA_LEVEL:
-        return 'water'
+        return BIOME_CODES['water']
     if drain < RIVER_THRESHOLD and SEA_LEVEL + 0.02 < elev < MOUNTAIN_LEVEL + 0.05:
-        return 'river'
+        return BIOME_CODES['river']
     if elev < SEA_LEVEL + BEACH_WIDTH:
-        return 'sand'
+        return BIOME_CODES['sand']
     if elev > MOUNTAIN_LEVEL:
-        return 'rock'
+        return BIOME_CODES['rock']
     if moist > 0.58 and elev < MOUNTAIN_LEVEL - 0.05:
-        return 'forest'
-    return 'grass'
+        return BIOME_CODES['forest']
+    return BIOME_CODES['grass']
+
+# Every threshold classify_biome() tests, per input. Strict '>' tests use the
+# next float up so that searchsorted(side='right') puts ties in the lower band.
+ELEV_EDGES = np.array(sorted([
+    SEA_LEVEL,
+    np.nextafter(SEA_LEVEL + 0.02, 2.0),
+    SEA_LEVEL + BEACH_WIDTH,
+    MOUNTAIN_LEVEL - 0.05,
+    np.nextafter(MOUNTAIN_LEVEL, 2.0),
+    MOUNTAIN_LEVEL + 0.05,
+]))
+MOIST_EDGES = np.array([np.nextafter(0.58, 2.0)])
+DRAIN_EDGES = np.array([RIVER_THRESHOLD])
+
+def band_samples(edges):
+    return [edges[0] - 1.0] + list(edges)
+
+# Biome code for every (elev band, moist band, drain band) combination, so the
+# per-tile classification is three searchsorted calls and one gather
+BIOME_LUT = np.array([
+    [[classify_biome(e, m, d) for d in band_samples(DRAIN_EDGES)] for m in band_samples(MOIST_EDGES)]
+    for e in band_samples(ELEV_EDGES)
+], dtype=np.uint8)
+
+# Biome codes for the w x h tiles starting at (x0, y0), indexed [dx, dy]
+def get_biome_grid(x0, y0, w, h):
+    # Tile centres of the block padded by NEAR_SEA_STEP on every side; only
+    # the coastal neighbourhood count reads the padding
+    step = NEAR_SEA_STEP
+    px, py = np.meshgrid(np.arange(x0 - step, x0 + w + step), np.arange(y0 - step, y0 + h + step), indexing='ij')
+    px = px + 0.5
+    py = py + 0.5
+    sx = px[step:step + w, step:step + h]
+    sy = py[step:step + w, step:step + h]
+
+    # The coastal term uses the first COAST_OCTAVES elevation octaves, so those
+    # are sampled once over the padded raster and reused by the full elevation
+    low = value_noise(px, py, ELEV_FREQS[:COAST_OCTAVES])
+    high = value_noise(sx, sy, ELEV_FREQS[COAST_OCTAVES:])
+    elev = (np.concatenate([low[:, step:step + w, step:step + h], high]) * ELEV_WEIGHTS).sum(axis=0)
+    continental = value_noise(sx, sy, ELEV_FREQ * 0.2) * 0.25 + 0.75
+    elev *= continental
+    elev = np.clip(elev, 0.0, 1.0)
+
+    moist = moist_fbm(sx + 2000, sy - 1230)
+    # Count the sea tiles in every tile's 3x3 neighbourhood with a separable
+    # box sum: three shifted slices along x, then three along y
+    below_sea = ((low * COAST_WEIGHTS).sum(axis=0) < SEA_LEVEL).astype(np.uint8)
+    sea_x = below_sea[:w] + below_sea[step:step + w] + below_sea[2 * step:2 * step + w]
+    sea_count = sea_x[:, :h] + sea_x[:, step:step + h] + sea_x[:, 2 * step:2 * step + h]
+    near_sea = sea_count / 9.0
+    moist *= (0.7 + 0.8 * near_sea)
+    moist = np.clip(moist, 0.0, 1.0)
+
+    drain = ridged_fbm(sx + 6000, sy - 4000, river_fbm)
+
+    return BIOME_LUT[
+        np.searchsorted(ELEV_EDGES, elev, side='right'),
+        np.searchsorted(MOIST_EDGES, moist, side='right'),
+        np.searchsorted(DRAIN_EDGES, drain, side='right'),
+    ]
+
+# Terrain is drawn on a whole-pixel grid: at a given zoom every chunk spans
+# chunk_px pixels and tile t starts at grid pixel tile_edge(t, chunk_px).
+# Drawing and mouse input both map through these so they always agree
+def tile_edge(t, chunk_px):
+    return (t * chunk_px + CHUNK_SIZE // 2) >> CHUNK_SHIFT
+
+def pixel_tile(p, chunk_px):
+    return (p * CHUNK_SIZE + CHUNK_SIZE // 2 - 1) // chunk_px
+
+# (chunk, local start, local end, screen position) spans for the chunks that
+# overlap the visible tile range [view_start, view_end), each covering its part
+# of the wider range [start, end). origin is the grid pixel at the screen's
+# left/top edge and edges gives the grid pixel of each local tile edge
+def chunk_spans(view_start, view_end, start, end, origin, chunk_px, edges):
+    spans = []
+    for c in range(view_start >> CHUNK_SHIFT, ((view_end - 1) >> CHUNK_SHIFT) + 1):
+        l0 = max(start - c * CHUNK_SIZE, 0)
+        l1 = min(end - c * CHUNK_SIZE, CHUNK_SIZE)
+        spans.append((c, l0, l1, c * chunk_px + edges[l0] - origin))
+    return spans
+
+# Least-recently-used store of generated chunks, bounded to `capacity` entries.
+# Evicted chunks are simply regenerated (painted tiles live in Game.overrides).
+class ChunkCache(OrderedDict):
+    def __init__(self, capacity):
+        super().__init__()
+        self.capacity = capacity
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.capacity:
+            self.popitem(last=False)
 
 # -------------------
 # Game Class
@@ -140,76 +289,163 @@ class Game:
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("EarthCube")
-        self.clock = pygame.time.Clock()
         self.camera_x, self.camera_y = 0.0, 0.0
         self.start_camera_x, self.start_camera_y = self.camera_x, self.camera_y
         self.zoom_factor = 1.0
-        self.terrain = {}
-        self.current_tool = 'grass'
+        # self.chunks holds the terrain as drawn, painted tiles included;
+        # self.overrides keeps a per-chunk layer of just the painted tiles
+        # (NO_OVERRIDE elsewhere). Both store biome codes, not names.
+        self.chunks = ChunkCache(CHUNK_CACHE_CAPACITY)
+        self.overrides = {}
+        self.current_tool = BIOME_CODES['grass']
         self.brush_size = 1
         self.is_painting = False
         self.dragging = False
         self.mouse_pos = (0, 0)
         self.font = pygame.font.SysFont(None, 24)
-        self.buttons = []
+        # Buttons are stored as parallel lists; labels are rendered once up front
+        self.button_types = []
+        self.button_values = []
+        self.button_rects = []
+        self.button_labels = []
         self.slider_dragging = False
         self.slider_rect = pygame.Rect(0, 0, 0, 0)
+        self.ui_rect = pygame.Rect(0, 0, SCREEN_WIDTH, UI_HEIGHT)
+        self.ui_key = None
+        self.terrain_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT - UI_HEIGHT)).convert()
+        self.terrain_dirty = True
+        self.terrain_view = None
+        # Each generated chunk also has a surface with one pixel per tile,
+        # evicted alongside the chunk codes
+        self.chunk_surfs = ChunkCache(CHUNK_CACHE_CAPACITY)
+        # (cx, cy) -> ((rect, chunk_px), scaled surface) for the chunks drawn last
+        self.scaled_chunks = {}
+        # TERRAIN_PALETTE mapped to the chunk surfaces' native 32-bit pixel format
+        fmt_surf = pygame.Surface((1, 1)).convert()
+        self.terrain_pixel_lut = np.array(
+            [fmt_surf.map_rgb(color) for color in TERRAIN_PALETTE.tolist()], dtype=np.uint32
+        )
         self.setup_ui()
 
+    def add_button(self, btn_type, value, rect, label):
+        self.button_types.append(btn_type)
+        self.button_values.append(value)
+        self.button_rects.append(rect)
+        text_surf = self.font.render(label, True, (0, 0, 0)).convert_alpha()
+        self.button_labels.append((text_surf, text_surf.get_rect(center=rect.center)))
+
     def setup_ui(self):
         x = BUTTON_PADDING
         y = (UI_HEIGHT - BUTTON_HEIGHT) // 2
-        for material in TERRAIN_COLORS.keys():
+        for code, material in enumerate(BIOME_NAMES):
             rect = pygame.Rect(x, y, BUTTON_WIDTH, BUTTON_HEIGHT)
-            self.buttons.append(("material", material, rect))
+            self.add_button("material", code, rect, material)
             x += BUTTON_WIDTH + BUTTON_PADDING
         rect_minus = pygame.Rect(x, y, 40, BUTTON_HEIGHT)
-        self.buttons.append(("brush_minus", None, rect_minus))
+        self.add_button("brush_minus", None, rect_minus, "-")
         x += 40 + BUTTON_PADDING
         rect_plus = pygame.Rect(x, y, 40, BUTTON_HEIGHT)
-        self.buttons.append(("brush_plus", None, rect_plus))
+        self.add_button("brush_plus", None, rect_plus, "+")
         x += 40 + BUTTON_PADDING
         # Home button before slider
         rect_home = pygame.Rect(x, y, BUTTON_WIDTH, BUTTON_HEIGHT)
-        self.buttons.append(("home", None, rect_home))
+        self.add_button("home", None, rect_home, "Home")
         x += BUTTON_WIDTH + BUTTON_PADDING
         # Slider rect placeholder (position updated in draw_zoom_slider)
         self.slider_rect = pygame.Rect(x, (UI_HEIGHT - SLIDER_HEIGHT) // 2, SLIDER_WIDTH, SLIDER_HEIGHT)
 
+    def get_chunk(self, cx, cy):
+        chunk = self.chunks.get((cx, cy))
+        if chunk is None:
+            chunk = get_biome_grid(cx * CHUNK_SIZE, cy * CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE)
+            painted = self.overrides.get((cx, cy))
+            if painted is not None:
+                np.copyto(chunk, painted, where=painted != NO_OVERRIDE)
+            self.chunks[(cx, cy)] = chunk
+        return chunk
+
+    def get_chunk_surf(self, cx, cy):
+        surf = self.chunk_surfs.get((cx, cy))
+        if surf is None:
+            # Written as packed native-format pixels straight into the
+            # surface's memory; the pixel view locks the surface until deleted
+            surf = pygame.Surface((CHUNK_SIZE, CHUNK_SIZE)).convert()
+            pixels = pygame.surfarray.pixels2d(surf)
+            np.take(self.terrain_pixel_lut, self.get_chunk(cx, cy), out=pixels)
+            del pixels
+            self.chunk_surfs[(cx, cy)] = surf
+        return surf
+
+    # Paint the tile rectangle [x0, x1) x [y0, y1) with one slice store per
+    # touched chunk into its override layer, code array and surface
+    def fill_tiles(self, x0, y0, x1, y1, code):
+        color = int(self.terrain_pixel_lut[code])
+        for cx in range(x0 >> CHUNK_SHIFT, ((x1 - 1) >> CHUNK_SHIFT) + 1):
+            lx0 = max(x0 - cx * CHUNK_SIZE, 0)
+            lx1 = min(x1 - cx * CHUNK_SIZE, CHUNK_SIZE)
+            for cy in range(y0 >> CHUNK_SHIFT, ((y1 - 1) >> CHUNK_SHIFT) + 1):
+                ly0 = max(y0 - cy * CHUNK_SIZE, 0)
+                ly1 = min(y1 - cy * CHUNK_SIZE, CHUNK_SIZE)
+                key = (cx, cy)
+                painted = self.overrides.get(key)
+                if painted is None:
+                    painted = np.full((CHUNK_SIZE, CHUNK_SIZE), NO_OVERRIDE, dtype=np.uint8)
+                    self.overrides[key] = painted
+                painted[lx0:lx1, ly0:ly1] = code
+                # Chunks that are not loaded pick the paint up from the
+                # override layer when they are next generated
+                chunk = self.chunks.get(key)
+                if chunk is not None:
+                    chunk[lx0:lx1, ly0:ly1] = code
+                surf = self.chunk_surfs.get(key)
+                if surf is not None:
+                    surf.fill(color, (lx0, ly0, lx1 - lx0, ly1 - ly0))
+                self.scaled_chunks.pop(key, None)
+
     def paint_tile(self, mx, my):
         my -= UI_HEIGHT
         if my < 0:
             return
-        tile_size = TILE_SIZE * self.zoom_factor
-        world_x = self.camera_x + mx / tile_size
-        world_y = self.camera_y + my / tile_size
-        tile_x = math.floor(world_x)
-        tile_y = math.floor(world_y)
-        for dx in range(-self.brush_size + 1, self.brush_size):
-            for dy in range(-self.brush_size + 1, self.brush_size):
-                self.terrain[(tile_x + dx, tile_y + dy)] = self.current_tool
+        chunk_px = self.chunk_px()
+        origin_x, origin_y = self.view_origin(chunk_px)
+        tile_x = pixel_tile(origin_x + mx, chunk_px)
+        tile_y = pixel_tile(origin_y + my, chunk_px)
+        self.fill_tiles(
+            tile_x - self.brush_size + 1, tile_y - self.brush_size + 1,
+            tile_x + self.brush_size, tile_y + self.brush_size,
+            self.current_tool,
+        )
+        self.terrain_dirty = True
+
+    # Pixels per chunk on the terrain grid at the current zoom
+    def chunk_px(self):
+        return round(CHUNK_SIZE * TILE_SIZE * self.zoom_factor)
+
+    # Grid pixel at the top-left corner of the terrain view
+    def view_origin(self, chunk_px):
+        scale = chunk_px / CHUNK_SIZE
+        return round(self.camera_x * scale), round(self.camera_y * scale)
 
     def zoom_at(self, factor_mult, mx, my):
-        old_tile_size = TILE_SIZE * self.zoom_factor
-        world_x = self.camera_x + mx / old_tile_size
-        world_y = self.camera_y + (my - UI_HEIGHT) / old_tile_size
-        self.zoom_factor *= factor_mult
-        self.zoom_factor = max(MIN_ZOOM, min(MAX_ZOOM, self.zoom_factor))
-        new_tile_size = TILE_SIZE * self.zoom_factor
-        if new_tile_size == 0:
-            return
-        self.camera_x = world_x - mx / new_tile_size
-        self.camera_y = world_y - (my - UI_HEIGHT) / new_tile_size
+        my -= UI_HEIGHT
+        old_chunk_px = self.chunk_px()
+        self.zoom_factor = max(MIN_ZOOM, min(MAX_ZOOM, self.zoom_factor * factor_mult))
+        # The world point under the mouse stays put: the camera moves by the
+        # mouse offset times the change in world units per pixel
+        shift = CHUNK_SIZE / old_chunk_px - CHUNK_SIZE / self.chunk_px()
+        self.camera_x += mx * shift
+        self.camera_y += my * shift
 
     def handle_ui_click(self, pos):
         if self.slider_rect.collidepoint(pos):
             self.slider_dragging = True
             self.update_zoom_from_slider(pos[0])
             return True
-        for btn_type, value, rect in self.buttons:
+        for i, rect in enumerate(self.button_rects):
             if rect.collidepoint(pos):
+                btn_type = self.button_types[i]
                 if btn_type == "material":
-                    self.current_tool = value
+                    self.current_tool = self.button_values[i]
                 elif btn_type == "brush_minus":
                     self.brush_size = max(1, self.brush_size - 1)
                 elif btn_type == "brush_plus":
@@ -231,32 +467,82 @@ class Game:
         t = max(0, min(1, t))
         self.zoom_factor = MIN_ZOOM + t * (MAX_ZOOM - MIN_ZOOM)
 
-    def draw_zoom_slider(self):
-        pygame.draw.rect(self.screen, (100, 100, 100), self.slider_rect)
+    def draw_zoom_slider(self, surface):
+        pygame.draw.rect(surface, (100, 100, 100), self.slider_rect)
         t = (self.zoom_factor - MIN_ZOOM) / (MAX_ZOOM - MIN_ZOOM)
         handle_x = self.slider_rect.x + int(t * (SLIDER_WIDTH - SLIDER_HEIGHT))
-        pygame.draw.rect(self.screen, (200, 200, 200), (handle_x, self.slider_rect.y, SLIDER_HEIGHT, SLIDER_HEIGHT))
-
+        pygame.draw.rect(surface, (200, 200, 200), (handle_x, self.slider_rect.y, SLIDER_HEIGHT, SLIDER_HEIGHT))
+
+    # Render the visible terrain into terrain_surf, which main() reuses until
+    # the camera, zoom or painted tiles change
+    def draw_terrain(self):
+        chunk_px = self.chunk_px()
+        origin_x, origin_y = self.view_origin(chunk_px)
+        tx0 = pixel_tile(origin_x, chunk_px)
+        ty0 = pixel_tile(origin_y, chunk_px)
+        tx1 = pixel_tile(origin_x + SCREEN_WIDTH - 1, chunk_px) + 1
+        ty1 = pixel_tile(origin_y + SCREEN_HEIGHT - UI_HEIGHT - 1, chunk_px) + 1
+        step = max(1, math.ceil(SCALE_STEP_PX * CHUNK_SIZE / chunk_px))
+        x0 = tx0 // step * step
+        y0 = ty0 // step * step
+        x1 = -(-tx1 // step) * step
+        y1 = -(-ty1 // step) * step
+
+        # A chunk's scaled size and its tile edges on the grid do not depend on
+        # the camera. Only chunks overlapping the view are drawn; each is
+        # scaled over its part of the stepped view and reused while that part
+        # and the zoom stay the same
+        edges = [tile_edge(i, chunk_px) for i in range(CHUNK_SIZE + 1)]
+        # Pixel width of each local tile. Pieces are scaled by repeating tiles
+        # by these widths rather than with transform.scale, whose own rounding
+        # would move tile edges off the grid
+        widths = np.diff(edges)
+        cols = chunk_spans(tx0, tx1, x0, x1, origin_x, chunk_px, edges)
+        rows = chunk_spans(ty0, ty1, y0, y1, origin_y, chunk_px, edges)
+        old_scaled = self.scaled_chunks
+        scaled_chunks = {}
+        blit_seq = []
+        for cx, lx0, lx1, screen_x in cols:
+            for cy, ly0, ly1, screen_y in rows:
+                rect = (lx0, ly0, lx1 - lx0, ly1 - ly0)
+                entry = old_scaled.get((cx, cy))
+                if entry is None or entry[0] != (rect, chunk_px):
+                    size = (edges[lx1] - edges[lx0], edges[ly1] - edges[ly0])
+                    piece = pygame.Surface(size, 0, self.terrain_surf)
+                    src = pygame.surfarray.pixels2d(self.get_chunk_surf(cx, cy))
+                    dst = pygame.surfarray.pixels2d(piece)
+                    # Surface rows are contiguous in the transposed views
+                    stretched = np.repeat(src.T[ly0:ly1, lx0:lx1], widths[ly0:ly1], axis=0)
+                    dst.T[...] = np.repeat(stretched, widths[lx0:lx1], axis=1)
+                    del src, dst
+                    entry = ((rect, chunk_px), piece)
+                scaled_chunks[(cx, cy)] = entry
+                blit_seq.append((entry[1], (screen_x, screen_y)))
+        self.terrain_surf.blits(blit_seq, doreturn=False)
+        self.scaled_chunks = scaled_chunks
+
+    # The UI bar only changes with the selected tool and the zoom, so it is
+    # redrawn on the screen only when one of them changes.
+    # Returns whether it changed
     def draw_ui(self):
-        pygame.draw.rect(self.screen, (50, 50, 50), (0, 0, SCREEN_WIDTH, UI_HEIGHT))
-        for btn_type, value, rect in self.buttons:
+        ui_key = (self.current_tool, self.zoom_factor)
+        if ui_key == self.ui_key:
+            return False
+        self.ui_key = ui_key
+        surface = self.screen
+        surface.fill((50, 50, 50), self.ui_rect)
+        for btn_type, value, rect in zip(self.button_types, self.button_values, self.button_rects):
             color = (200, 200, 200)
             if btn_type == "material" and value == self.current_tool:
                 color = (255, 255, 255)
-            pygame.draw.rect(self.screen, color, rect)
-            pygame.draw.rect(self.screen, (0, 0, 0), rect, 2)
-            if btn_type == "material":
-                text_surf = self.font.render(value, True, (0, 0, 0))
-            elif btn_type == "brush_minus":
-                text_surf = self.font.render("-", True, (0, 0, 0))
-            elif btn_type == "brush_plus":
-                text_surf = self.font.render("+", True, (0, 0, 0))
-            elif btn_type == "home":
-                text_surf = self.font.render("Home", True, (0, 0, 0))
-            self.screen.blit(text_surf, text_surf.get_rect(center=rect.center))
-        self.draw_zoom_slider()
+            pygame.draw.rect(surface, color, rect)
+            pygame.draw.rect(surface, (0, 0, 0), rect, 2)
+        surface.blits(self.button_labels, doreturn=False)
+        self.draw_zoom_slider(surface)
+        return True
 
     async def main(self):
+        next_frame = time.monotonic()
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -280,62 +566,63 @@ class Game:
                     if self.dragging:
                         dx = event.pos[0] - self.drag_start_x
                         dy = event.pos[1] - self.drag_start_y
-                        tile_size = TILE_SIZE * self.zoom_factor
-                        if tile_size != 0:
-                            self.camera_x -= dx / tile_size
-                            self.camera_y -= dy / tile_size
+                        tiles_per_px = CHUNK_SIZE / self.chunk_px()
+                        self.camera_x -= dx * tiles_per_px
+                        self.camera_y -= dy * tiles_per_px
                         self.drag_start_x, self.drag_start_y = event.pos
                     if self.slider_dragging:
                         self.update_zoom_from_slider(event.pos[0])
                 elif event.type == pygame.MOUSEWHEEL:
-                    mx, my = pygame.mouse.get_pos()
+                    mx, my = self.mouse_pos
                     if my > UI_HEIGHT:
                         if event.y > 0:
                             self.zoom_at(1.1, mx, my)
                         elif event.y < 0:
                             self.zoom_at(1 / 1.1, mx, my)
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+                    # The window contents may have been lost, so the next
+                    # frame redraws and presents everything
+                    self.terrain_dirty = True
+                    self.ui_key = None
                 self.handle_slider_event(event)
 
             keys = pygame.key.get_pressed()
             pixels_per_second = 400
-            move_speed = (pixels_per_second / TILE_SIZE) / self.zoom_factor / 60.0
-            if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-                self.camera_x -= move_speed
-            if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-                self.camera_x += move_speed
-            if keys[pygame.K_UP] or keys[pygame.K_w]:
-                self.camera_y -= move_speed
-            if keys[pygame.K_DOWN] or keys[pygame.K_s]:
-                self.camera_y += move_speed
-
-            self.screen.fill((0, 0, 0))
-            tile_size = TILE_SIZE * self.zoom_factor
-            tiles_wide = math.ceil(SCREEN_WIDTH / tile_size) + 2
-            tiles_high = math.ceil((SCREEN_HEIGHT - UI_HEIGHT) / tile_size) + 2
-            start_x = math.floor(self.camera_x)
-            start_y = math.floor(self.camera_y)
-            offset_x = (start_x - self.camera_x) * tile_size
-            offset_y = (start_y - self.camera_y) * tile_size + UI_HEIGHT
-
-            for dx in range(tiles_wide):
-                for dy in range(tiles_high):
-                    tile_x = start_x + dx
-                    tile_y = start_y + dy
-                    if (tile_x, tile_y) not in self.terrain:
-                        self.terrain[(tile_x, tile_y)] = get_tile_biome(tile_x, tile_y)
-                    color = TERRAIN_COLORS[self.terrain[(tile_x, tile_y)]]
-                    pygame.draw.rect(
-                        self.screen, color,
-                        (round(offset_x + dx * tile_size),
-                         round(offset_y + dy * tile_size),
-                         math.ceil(tile_size) + 1,
-                         math.ceil(tile_size) + 1)
-                    )
-
-            self.draw_ui()
-            pygame.display.flip()
-            self.clock.tick(60)
-            await asyncio.sleep(1.0 / 60)
+            move_speed = (pixels_per_second / TILE_SIZE) / self.zoom_factor / ACTIVE_FPS
+            move_x = (keys[pygame.K_RIGHT] or keys[pygame.K_d]) - (keys[pygame.K_LEFT] or keys[pygame.K_a])
+            move_y = (keys[pygame.K_DOWN] or keys[pygame.K_s]) - (keys[pygame.K_UP] or keys[pygame.K_w])
+            moving = bool(move_x or move_y)
+            if moving:
+                self.camera_x += move_x * move_speed
+                self.camera_y += move_y * move_speed
+
+            # Panning and zooming are detected by comparing the view with the
+            # one terrain_surf was last drawn for; painting sets terrain_dirty
+            view = (self.camera_x, self.camera_y, self.zoom_factor)
+            terrain_changed = self.terrain_dirty or view != self.terrain_view
+            if terrain_changed:
+                self.draw_terrain()
+                self.terrain_dirty = False
+                self.terrain_view = view
+                terrain_rect = self.screen.blit(self.terrain_surf, (0, UI_HEIGHT))
+            ui_changed = self.draw_ui()
+
+            # The screen keeps what was drawn before, so only the parts that
+            # changed are redrawn and presented; an idle frame does neither
+            if terrain_changed and ui_changed:
+                pygame.display.flip()
+            elif terrain_changed:
+                pygame.display.update(terrain_rect)
+            elif ui_changed:
+                pygame.display.update(self.ui_rect)
+            # Drop to IDLE_FPS when nothing is being painted, dragged or moved
+            active = moving or self.is_painting or self.dragging or self.slider_dragging
+            fps = ACTIVE_FPS if active else IDLE_FPS
+            # A single deadline-based sleep paces the loop; after a stall the
+            # schedule restarts from now instead of rushing to catch up
+            now = time.monotonic()
+            next_frame = max(next_frame + 1.0 / fps, now)
+            await asyncio.sleep(next_frame - now)
 
 if platform.system() == "Emscripten":
     asyncio.ensure_future(Game().main())